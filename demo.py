@@ -7,32 +7,34 @@ the conversion process and results.
 """
 
 import shutil
-from tgs_to_webp import convert_tgs_to_webp, TGSToWebPConverter
-from lottie.parsers.tgs import parse_tgs
+import logging
+from tgs_to_webp import convert_tgs_to_webp, TGSToWebPConverter, load_tgs
 from PIL import Image
 import os
-import glob
 import time
 
+def analyze_animation(lottie_animation):
+    """Print and return timing information for an already-parsed Lottie animation."""
+    total_frames = int(lottie_animation.out_point - lottie_animation.in_point)
+    fps = lottie_animation.frame_rate
+    duration = total_frames / fps
+    
+    print(f"    ⏱️  Original: {total_frames} frames at {fps} FPS")
+    print(f"    🕐 Duration: {duration:.3f} seconds")
+    return total_frames, fps, duration
+
 def analyze_tgs_file(file_path):
-    """Analyze a TGS file and return detailed information."""
+    """Analyze a TGS file and return the parsed animation along with its timing information."""
     try:
         print(f"    📁 Analyzing: {os.path.basename(file_path)}")
         
-        with open(file_path, 'rb') as f:
-            lottie_animation = parse_tgs(f)
-        
-        total_frames = int(lottie_animation.out_point - lottie_animation.in_point)
-        fps = lottie_animation.frame_rate
-        duration = total_frames / fps
-        
-        print(f"    ⏱️  Original: {total_frames} frames at {fps} FPS")
-        print(f"    🕐 Duration: {duration:.3f} seconds")
-        return total_frames, fps, duration
+        # The parsed animation is handed back so the conversion that follows doesn't parse it again
+        lottie_animation = load_tgs(file_path)
+        return (lottie_animation, *analyze_animation(lottie_animation))
         
     except Exception as e:
         print(f"    ❌ Analysis failed: {e}")
-        return None, None, None
+        return None, None, None, None
 
 def analyze_webp_output(file_path):
     """Analyze WebP output and return information."""
@@ -60,13 +62,17 @@ def analyze_webp_output(file_path):
         print(f"    ❌ Output analysis failed: {e}")
         return False
 
-def demo_basic_conversion():
+def list_files(directory, extension):
+    """List files in directory with the given extension in a single directory scan."""
+    with os.scandir(directory) as entries:
+        return [entry.path for entry in entries if entry.is_file() and entry.name.endswith(extension)]
+
+def demo_basic_conversion(input_files):
     """Demo 1: Basic conversion with automatic timing preservation."""
     print("🟢 Demo 1: Basic Conversion (Recommended)")
     print("=" * 50)
     print("Using simple convert_tgs_to_webp() with automatic timing preservation\nDimensions: Original  Quality: Default(80)")
     
-    input_files = glob.glob("demo_inp/*.tgs")
     if not input_files:
         print("❌ No TGS files found in demo_inp/")
         return False
@@ -76,14 +82,14 @@ def demo_basic_conversion():
         print(f"\n📂 Converting file {i}/{len(input_files)}")
         
         # Analyze input
-        orig_frames, orig_fps, orig_duration = analyze_tgs_file(input_file)
+        animation, orig_frames, orig_fps, orig_duration = analyze_tgs_file(input_file)
         
         # Convert with automatic timing
         output_file = f"demo_out/basic_{i}.webp"
         print(f"    🔄 Converting with automatic timing preservation...")
         
         start_time = time.time()
-        success = convert_tgs_to_webp(input_file, output_file)
+        success = convert_tgs_to_webp(animation or input_file, output_file)
         conversion_time = time.time() - start_time
         
         if success:
@@ -96,13 +102,12 @@ def demo_basic_conversion():
     print(f"\n📊 Basic Conversion Summary: {success_count}/{len(input_files)} successful")
     return success_count > 0
 
-def demo_custom_settings():
+def demo_custom_settings(input_files):
     """Demo 2: Custom resolution and quality settings."""
     print("\n\n🟡 Demo 2: Custom Resolution & Quality")
     print("=" * 50)
     print("Using custom width, height, and quality settings\nAutomatic timing preservation: Enabled")
     
-    input_files = glob.glob("demo_inp/*.tgs")
     if not input_files:
         return False
     
@@ -119,12 +124,12 @@ def demo_custom_settings():
         input_file = input_files[0]  # Use first file
         output_file = f"demo_out/custom_{setting['name']}.webp"
         
-        analyze_tgs_file(input_file)
+        animation = analyze_tgs_file(input_file)[0]
         
         print(f"    🔄 Converting...")
         start_time = time.time()
         success = convert_tgs_to_webp(
-            input_file, 
+            animation or input_file, 
             output_file,
             width=setting['width'],
             height=setting['height'],
@@ -138,13 +143,12 @@ def demo_custom_settings():
         else:
             print(f"    ❌ Conversion failed")
 
-def demo_class_usage():
+def demo_class_usage(input_files):
     """Demo 3: Using the TGSToWebPConverter class."""
     print("\n\n🟣 Demo 3: Class-Based Usage")
     print("=" * 50)
     print("Using TGSToWebPConverter class for advanced control")
     
-    input_files = glob.glob("demo_inp/*.tgs")
     if not input_files:
         return False
     
@@ -161,13 +165,16 @@ def demo_class_usage():
     for i, input_file in enumerate(input_files, 1):
         print(f"\n📂 Processing file {i}/{len(input_files)} with class")
         
-        analyze_tgs_file(input_file)
+        animation = analyze_tgs_file(input_file)[0]
         
         output_file = f"demo_out/class_{i}.webp"
         print(f"    🔄 Converting using class method...")
         
         start_time = time.time()
-        success = converter.convert(input_file, output_file)
+        if animation is not None:
+            success = converter.convert_animation(animation, output_file)
+        else:
+            success = converter.convert(input_file, output_file)
         conversion_time = time.time() - start_time
         
         if success:
@@ -176,20 +183,19 @@ def demo_class_usage():
         else:
             print(f"    ❌ Conversion failed")
 
-def demo_manual_timing():
+def demo_manual_timing(input_files):
     """Demo 4: Manual timing control (advanced)."""
     print("\n\n🔴 Demo 4: Manual Timing Override (Advanced)")
     print("=" * 50)
     print("Demonstrating manual FPS control by disabling automatic timing\nResolution: Original and Quality: Default")
     
-    input_files = glob.glob("demo_inp/*.tgs")
     if not input_files:
         return False
     
     input_file = input_files[0]  # Use first file
     
     print(f"🎛️  Testing manual FPS settings on: {os.path.basename(input_file)}")
-    analyze_tgs_file(input_file)
+    animation = analyze_tgs_file(input_file)[0]
     
     # Test different manual FPS settings
     fps_settings = [15, 30, 60]
@@ -201,7 +207,7 @@ def demo_manual_timing():
         print(f"    🔄 Converting with preserve_timing=False, fps={fps}...")
         start_time = time.time()
         success = convert_tgs_to_webp(
-            input_file, 
+            animation or input_file, 
             output_file,
             fps=fps,
             preserve_timing=False  # Disable automatic timing
@@ -215,6 +221,9 @@ def demo_manual_timing():
             print(f"    ❌ Conversion failed")
 
 def main():
+    # Show the converter's progress messages, which it logs instead of printing
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     print("🎬 TGS to WebP Converter - Comprehensive Demo")
     print("=" * 60)
     print("This demo shows the automatic timing preservation feature")
@@ -223,8 +232,8 @@ def main():
     # Create output directory
     os.makedirs("demo_out", exist_ok=True)
     
-    # Check for input files
-    input_files = glob.glob("demo_inp/*.tgs")
+    # Check for input files (scanned once and shared by every demo)
+    input_files = list_files("demo_inp", ".tgs")
     if not input_files:
         print("❌ No TGS files found in demo_inp/ directory")
         print("Please add some .tgs files to demo_inp/ and run again.")
@@ -242,10 +251,10 @@ def main():
 
     # Run all demos
     try:
-        demo_basic_conversion()
-        demo_custom_settings()  
-        demo_class_usage()
-        demo_manual_timing()
+        demo_basic_conversion(input_files)
+        demo_custom_settings(input_files)
+        demo_class_usage(input_files)
+        demo_manual_timing(input_files)
         
         print("\n\n🎉 Demo Complete!")
         print("=" * 60)
@@ -259,7 +268,7 @@ def main():
         print(f"\n📂 Check demo_out/ directory for all generated WebP files")
         
         # List output files
-        output_files = glob.glob("demo_out/*.webp")
+        output_files = list_files("demo_out", ".webp")
         if output_files:
             print(f"\n📋 Generated {len(output_files)} WebP files:")
             for f in sorted(output_files):
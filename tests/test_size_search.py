@@ -0,0 +1,133 @@
+import random
+
+import pytest
+
+try:
+    import tgs_to_webp_with_file_size_restriction as capped
+except (ImportError, OSError) as e:  # cairocffi raises OSError when the cairo library is missing
+    pytest.skip(f"size-capped converter unavailable: {e}", allow_module_level=True)
+
+Converter = capped.TGSToWebPConverter
+
+
+class Recorder:
+    """Synthetic evaluator: value -> size through curve, remembering every value probed."""
+
+    def __init__(self, curve):
+        self.curve = curve
+        self.probed = []
+
+    def __call__(self, value):
+        self.probed.append(value)
+        return self.curve(value)
+
+
+def _monotone_curves(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        kind = rng.choice(("linear", "quadratic", "step"))
+        a, b = rng.uniform(1, 60), rng.uniform(0, 400)
+        if kind == "linear":
+            yield lambda v, a=a, b=b: a * v + b
+        elif kind == "quadratic":
+            yield lambda v, a=a, b=b: a * v * v / 10 + b
+        else:
+            step = rng.randint(2, 8)
+            yield lambda v, a=a, b=b, step=step: a * step * (v // step) + b
+
+
+@pytest.mark.parametrize("search", [Converter._interpolation_search, Converter._binary_search])
+def test_never_returns_a_value_over_the_cap(search):
+    rng = random.Random(1)
+    for curve in _monotone_curves(2000):
+        low, high = rng.randint(1, 20), rng.randint(20, 100)
+        floor = rng.uniform(100, 2000)
+        target = (floor, floor * rng.uniform(1.05, 1.5))
+        value, size = search(target, (low, high), curve)
+        if value is not None:
+            assert size <= target[1]
+            assert size == curve(value)
+
+
+def test_interpolation_search_lands_in_band_or_on_largest_fitting_value():
+    rng = random.Random(2)
+    for curve in _monotone_curves(2000, seed=3):
+        low, high = rng.randint(1, 20), rng.randint(20, 100)
+        floor = rng.uniform(100, 2000)
+        target = (floor, floor * rng.uniform(1.05, 1.5))
+        value, size = Converter._interpolation_search(target, (low, high), curve)
+
+        fitting = [v for v in range(low, high + 1) if curve(v) <= target[1]]
+        in_band = [v for v in fitting if curve(v) >= target[0]]
+        if not fitting:
+            assert value is None
+        elif in_band:
+            assert value in in_band
+        else:
+            assert value == max(fitting)
+
+
+def test_interpolation_search_hands_non_monotone_sizes_to_binary_search(monkeypatch):
+    calls = []
+    original = Converter._binary_search
+
+    def spy(target_range, search_space, evaluator_func):
+        calls.append(search_space)
+        return original(target_range, search_space, evaluator_func)
+
+    monkeypatch.setattr(Converter, "_binary_search", staticmethod(spy))
+
+    # Ends bracket the band, but the first interpolated probe comes out bigger than the top end
+    sizes = {1: 100, 40: 1000}
+    curve = Recorder(lambda v: sizes.get(v, 5000))
+    value, size = Converter._interpolation_search((400, 500), (1, 40), curve)
+
+    assert len(calls) == 1
+    low, high = calls[0]
+    assert (low, high) == (1, 40)
+    assert value is None or size <= 500
+
+
+@pytest.mark.parametrize("space", [(3, 7), (10, 10), (1, 5)])
+def test_small_ranges_are_scanned_down_from_the_top(space):
+    low, high = space
+    assert high - low <= capped._LINEAR_SCAN_MAX_SPAN
+    curve = Recorder(lambda v: v * 100)
+
+    value, size = Converter._interpolation_search((250, 350), space, curve)
+
+    fitting = [v for v in range(low, high + 1) if v * 100 <= 350]
+    assert value == (max(fitting) if fitting else None)
+    # Probed from the top down, stopping at the first value that fits
+    expected = list(range(high, (value if value is not None else low) - 1, -1))
+    assert curve.probed == expected
+
+
+def test_size_model_needs_two_values_and_fits_lines_exactly():
+    model = capped._SizeModel()
+    assert model.predict(10) is None
+    model.add(10, 1000)
+    model.add(10, 1100)  # Same value again: still only one point to fit
+    assert model.predict(10) is None
+
+    model = capped._SizeModel()
+    for value in (5, 12, 30):
+        model.add(value, 40 * value + 300)
+    assert model.predict(20) == pytest.approx(1100)
+    assert model.predict(60) == pytest.approx(2700)
+
+
+@pytest.mark.parametrize("ratio", [0.4, 0.0, -1.0])
+def test_predictions_within_the_cap_are_always_encoded(monkeypatch, ratio):
+    """A prediction that skips encoding must never be small enough for the search to pick it as the winner."""
+    monkeypatch.setattr(capped, "_MODEL_SKIP_RATIO", ratio)
+    target = (390 * 1024, 490 * 1024)
+    assert not capped._predicted_too_big(None, target)
+    for predicted in (0, target[0], (target[0] + target[1]) / 2, target[1]):
+        assert not capped._predicted_too_big(predicted, target)
+
+
+def test_predictions_far_over_the_band_are_skipped():
+    target = (390 * 1024, 490 * 1024)
+    assert capped._predicted_too_big(3 * target[1], target)
+    assert not capped._predicted_too_big(target[1] + 1, target)
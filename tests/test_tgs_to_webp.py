@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+try:
+    import tgs_to_webp
+except (ImportError, OSError) as e:  # cairocffi raises OSError when the cairo library is missing
+    pytest.skip(f"converter unavailable: {e}", allow_module_level=True)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEMO_TGS = os.path.join(ROOT, "demo_inp", "AnimatedSticker_1753082237037.tgs")
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 2, reason="needs at least 2 cores to render on a pool")
+@pytest.mark.parametrize("backend", ["auto", "rlottie"])
+def test_pooled_conversion_after_in_process_render(tmp_path, backend):
+    """A pooled conversion must not hang after the same process rendered a still itself."""
+    if backend == "rlottie" and tgs_to_webp.rlottie_python is None:
+        pytest.skip("rlottie-python is not installed")
+
+    # Run in a child process: a deadlocked pool would otherwise hang the test run itself
+    script = textwrap.dedent(f"""
+        import json
+        from lottie.objects import Animation
+        from tgs_to_webp import TGSToWebPConverter, load_tgs
+
+        converter = TGSToWebPConverter(backend={backend!r})
+        still = Animation.load(json.loads(json.dumps(load_tgs({DEMO_TGS!r}).to_dict())))
+        still.out_point = still.in_point + 1
+        assert converter.convert_animation(still, {str(tmp_path / "still.webp")!r})
+        assert converter.convert({DEMO_TGS!r}, {str(tmp_path / "animated.webp")!r})
+    """)
+    subprocess.run([sys.executable, "-c", script], cwd=ROOT, check=True, timeout=120)
+
+    assert (tmp_path / "still.webp").stat().st_size > 0
+    assert (tmp_path / "animated.webp").stat().st_size > 0
+
+
+def _first_frame_coverage(webp_path):
+    """Size of the output and the bounding box of the first frame's visible pixels."""
+    from PIL import Image
+    with Image.open(webp_path) as img:
+        return img.size, img.convert('RGBA').getchannel('A').getbbox()
+
+
+def test_backends_agree_on_non_proportional_size(tmp_path):
+    """Every backend stretches the animation over a size with another aspect ratio, none letterboxes it."""
+    backends = ["auto", "cairo"]
+    if tgs_to_webp.rlottie_python is not None:
+        backends.append("rlottie")
+
+    results = {}
+    for backend in backends:
+        webp_path = str(tmp_path / f"{backend}.webp")
+        assert tgs_to_webp.convert_tgs_to_webp(DEMO_TGS, webp_path, width=400, height=200, backend=backend)
+        results[backend] = _first_frame_coverage(webp_path)
+
+    reference_size, reference_box = results["cairo"]
+    assert reference_size == (400, 200)
+    for backend, (size, box) in results.items():
+        assert size == reference_size, backend
+        # Antialiasing differs a little between renderers, but letterboxing would be off by ~100 px
+        assert all(abs(a - b) <= 4 for a, b in zip(box, reference_box)), (backend, box, reference_box)
@@ -7,73 +7,449 @@ TGS files are gzip-compressed Lottie JSON animations.
 
 import os
 import io
+import gzip
+import json
+import logging
 import webp
 import time
-from PIL import Image, ImageDraw
-from lottie.parsers.tgs import parse_tgs
-from lottie.exporters.svg import export_svg
+import queue
+import threading
+import functools
+import hashlib
+import collections
+import multiprocessing
+import cairocffi as cairo
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from lottie.objects import Animation
+from lottie.parsers.svg.builder import to_svg
 from lottie.exporters.cairo import cairosvg
 
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())  # Silent unless the application configures logging
+
+try:
+    import resvg_py  # Optional: native (Rust) SVG rasterizer, see backend='resvg'
+except ImportError:
+    resvg_py = None
+
+try:
+    import rlottie_python  # Optional: native (C++) Lottie renderer, see backend='rlottie'
+except ImportError:
+    rlottie_python = None
+
+
+class _RasterSurface(cairosvg.surface.PNGSurface):
+    """cairosvg surface that draws into an existing cairo ImageSurface instead of encoding a PNG."""
+
+    def __init__(self, tree, target, width: int, height: int):
+        self._target = target
+        # output=None keeps cairosvg from writing anything; the pixels stay on the target surface.
+        super().__init__(tree, None, 96, output_width=width, output_height=height)
+
+    def _create_surface(self, width, height):
+        return self._target, self._target.get_width(), self._target.get_height()
+
+
+@functools.lru_cache(maxsize=128)
+def _read_tgs_json(tgs_path: str, mtime_ns: int, size: int) -> bytes:
+    # Decompressed JSON is small and immutable, so far more of it can be kept than parsed models
+    with open(tgs_path, 'rb') as f:
+        data = f.read()
+    return gzip.decompress(data) if data[:2] == b'\x1f\x8b' else data
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_tgs_cached(tgs_path: str, mtime_ns: int, size: int):
+    return Animation.load(json.loads(_read_tgs_json(tgs_path, mtime_ns, size)))
+
+
+def load_tgs(tgs_path: str):
+    """
+    Parse a TGS file into a Lottie animation.
+    
+    The result is cached on (path, mtime, size), so analysing and then converting
+    the same unchanged file only pays for the gzip + JSON parse once. A larger cache
+    of the decompressed JSON backs it, so files evicted from the parsed cache don't
+    have to be read back from disk and gunzipped again.
+    """
+    stat = os.stat(tgs_path)
+    return _parse_tgs_cached(os.path.abspath(tgs_path), stat.st_mtime_ns, stat.st_size)
+
+
+def _write_output(path: str, data) -> None:
+    """Write the encoded WebP with a single unbuffered write into space reserved up front."""
+    if not hasattr(os, 'posix_fallocate'):
+        with open(path, 'wb') as f:
+            f.write(data)
+        return
+    
+    view = memoryview(data)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        try:
+            # One contiguous extent for the whole file instead of growing it write by write
+            os.posix_fallocate(fd, 0, view.nbytes)
+        except OSError:
+            pass  # Filesystem can't preallocate; the write below still works
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _import_rgba(picture: webp.WebPPicture, frame: np.ndarray) -> None:
+    """Load an (height, width, 4) RGBA frame into an existing WebPPicture."""
+    ptr = picture.ptr
+    ptr.height, ptr.width = frame.shape[:2]
+    ptr.use_argb = 1
+    pixels = webp.ffi.cast('uint8_t *', webp.ffi.from_buffer(frame))
+    if not webp.lib.WebPPictureImportRGBA(ptr, pixels, frame.shape[1] * 4):
+        raise webp.WebPError('memory error')
+
+
+# libwebp encoder presets, selectable by name; 'sticker' is an alias for the ICON preset
+_WEBP_PRESETS = {preset.name.lower(): preset for preset in webp.WebPPreset}
+_WEBP_PRESETS['sticker'] = webp.WebPPreset.ICON
+
+# Position of thread_level in libwebp's WebPConfig (encode.h). The webp binding does not
+# declare that field, so it is written through a raw int view; every field is 4 bytes wide.
+_WEBP_CONFIG_THREAD_LEVEL_INDEX = 21
+
+# Validated WebPConfigs of the current thread, keyed on the options they were built from,
+# so batch conversions with the same settings don't rebuild them for every sticker
+_ENCODER_TLS = threading.local()
+
+# Each worker process pays for its own startup, parse and surface, so it must have at
+# least this many frames to render; below 2x this, everything stays in one process
+_MIN_FRAMES_PER_WORKER = 4
+
+# Per-process state of the frame rendering pool, set up once by _init_render_worker
+_worker_converter = None
+_worker_animation = None
+
+# Parsed animation of the conversion currently running a pool; forked workers inherit it
+_shared_animation = None
+
+
+def _init_render_worker(source, converter: "TGSToWebPConverter", output_size: tuple):
+    """
+    Load the animation once per worker process and give it its own renderer state.
+    
+    source is None when the worker was forked and already holds the parent's parsed
+    animation in _shared_animation. Otherwise it is the TGS path, or for animations that
+    did not come from a file the model's to_dict() (lottie objects themselves can't be pickled).
+    """
+    global _worker_converter, _worker_animation
+    if source is None:
+        _worker_animation = _shared_animation
+    elif isinstance(source, (str, os.PathLike)):
+        _worker_animation = load_tgs(source)
+    else:
+        _worker_animation = Animation.load(source)
+    _worker_converter = converter
+    _worker_converter._create_surface(_worker_animation, output_size)
+
+
+def _render_frame(frame_num: int, previous_frame_num, total_frames: int):
+    """Render one frame inside a pool worker."""
+    frame = _worker_converter._render_lottie_frame(_worker_animation, frame_num, total_frames, previous_frame_num)
+    # Results travel back pickled a whole chunk at a time, so the renderer's shared
+    # frame buffer has to be copied before the next frame overwrites it
+    return None if frame is None else np.array(frame)
+
+
+def _render_frames(frame_nums: list, previous_frame_nums: list, total_frames: int) -> list:
+    """Render a run of consecutive frames inside a pool worker."""
+    return [_render_frame(frame_num, previous_frame_num, total_frames)
+            for frame_num, previous_frame_num in zip(frame_nums, previous_frame_nums)]
+
+
+def _iter_pool_frames(executor, frame_indices: list, previous_indices: list, total_frames: int,
+                      chunksize: int, max_in_flight: int):
+    """
+    Render frames on a process pool and yield them in order as they become available.
+    
+    Unlike executor.map, which queues every frame at once, only max_in_flight chunks are
+    submitted ahead of the one being consumed. Finished frames therefore can't pile up
+    when the encoder is the slower side. The FIFO of futures doubles as the reorder buffer.
+    """
+    pending = collections.deque()
+    try:
+        for start in range(0, len(frame_indices), chunksize):
+            pending.append(executor.submit(_render_frames, frame_indices[start:start + chunksize],
+                                           previous_indices[start:start + chunksize], total_frames))
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # Consumer gave up early (encoding failed): don't render what nobody will read
+        for future in pending:
+            future.cancel()
+
+
 class TGSToWebPConverter:
     """Converter class for TGS to WebP conversion with automatic timing preservation."""
     
-    def __init__(self, width: int = -1, height: int = -1, fps: int = 30, quality: int = 80, preserve_timing: bool = True):
+    def __init__(self, width: int = -1, height: int = -1, fps: int = 30, quality: int = 80, preserve_timing: bool = True,
+                 palette: bool = False, backend: str = 'auto', method: int = 0, thread_level: int = 1,
+                 lossless: bool = False, autofilter: bool = False, preset: str = 'default',
+                 filter_strength: int = None, allow_mixed: bool = False, alpha_quality: int = 100,
+                 minimize_size: bool = False, kmin: int = None, kmax: int = None):
         """
         Initialize the converter.
         
         Args:
-            width: Output width in pixels
-            height: Output height in pixels
+            width: Output width in pixels (-1 keeps the original, or scales with height)
+            height: Output height in pixels (-1 keeps the original, or scales with width)
             fps: Target frames per second (ignored if preserve_timing=True)
             quality: WebP quality (0-100)
             preserve_timing: If True, automatically adjusts FPS to preserve original animation timing
+            palette: If True, reduce each frame to a 256-colour palette and encode losslessly.
+                     Flat sticker art usually survives this untouched, and libwebp's lossless
+                     palette mode is both smaller and cheaper to encode than full RGBA.
+            backend: Frame renderer: 'cairo' (SVG via cairosvg), 'resvg' (SVG via the native Rust
+                     renderer, much faster per frame; needs `pip install resvg_py`), 'rlottie'
+                     (draws the Lottie animation natively with no SVG step at all, fastest;
+                     needs `pip install rlottie-python`), or 'auto' (default): rlottie when it
+                     is installed, cairo otherwise. rlottie can't be forked mid-render, so its
+                     render pools start their workers with spawn rather than fork.
+            method: WebP compression effort (0-6). 0 (the default) encodes fastest but biggest,
+                    6 slowest but smallest; 4 is libwebp's own balance point. 0-3 favour speed,
+                    4-6 favour size.
+            thread_level: 1 lets libwebp use extra threads inside each frame encode, 0 disables it
+            lossless: If True, encode losslessly (quality then trades encode speed for size)
+            autofilter: Let libwebp tune the lossy deblocking filter per frame. Off by default: it makes
+                        each frame encode 3-5x slower and doesn't make stickers any smaller.
+            preset: libwebp preset to start from: 'default', 'picture', 'photo', 'drawing', 'icon',
+                    'text', or 'sticker' (same as 'icon': small, colourful art)
+            filter_strength: Lossy deblocking filter strength (0-100, 0 = off); None keeps the
+                             preset's value. Ignored while autofilter is tuning it.
+            allow_mixed: Let libwebp pick lossy or lossless per frame, whichever is smaller
+                         (tries both, so encoding is slower)
+            alpha_quality: Quality of the lossy alpha plane (0-100). 100 (libwebp's default) keeps
+                           edges exact; lower values shrink the alpha but its noise defeats the
+                           frame-to-frame diffing, so stickers usually come out bigger overall.
+            minimize_size: Have libwebp search harder for the smallest animation (much slower)
+            kmin: Minimum distance between key frames; None keeps libwebp's default (no forced key frames)
+            kmax: Maximum distance between key frames; None keeps libwebp's default. Key frames make
+                  seeking cheaper for players but every one is a full-size frame.
         """
+        if backend not in ('auto', 'cairo', 'resvg', 'rlottie'):
+            raise ValueError(f"Unknown backend: {backend!r} (expected 'auto', 'cairo', 'resvg' or 'rlottie')")
+        if backend == 'auto':
+            backend = 'rlottie' if rlottie_python is not None else 'cairo'
+        if backend == 'resvg' and resvg_py is None:
+            raise ImportError("The 'resvg' backend needs the resvg_py package: pip install resvg_py")
+        if backend == 'rlottie' and rlottie_python is None:
+            raise ImportError("The 'rlottie' backend needs the rlottie-python package: pip install rlottie-python")
+        if preset not in _WEBP_PRESETS:
+            raise ValueError(f"Unknown preset: {preset!r} (expected one of {', '.join(_WEBP_PRESETS)})")
+
         self.width = width
         self.height = height
         self.fps = fps
         self.quality = quality
         self.preserve_timing = preserve_timing
+        self.palette = palette
+        self.backend = backend
+        self.method = method
+        self.thread_level = thread_level
+        self.lossless = lossless
+        self.autofilter = autofilter
+        self.preset = preset
+        self.filter_strength = filter_strength
+        self.allow_mixed = allow_mixed
+        self.alpha_quality = alpha_quality
+        self.minimize_size = minimize_size
+        self.kmin = kmin
+        self.kmax = kmax
+    
+    def __getstate__(self):
+        # cairo surfaces can't be pickled; pool workers create their own in _init_render_worker
+        state = self.__dict__.copy()
+        state.pop('_cairo_surface', None)
+        state.pop('_cairo_ctx', None)
+        state.pop('_rlottie_animation', None)
+        state.pop('_svg_buffer', None)
+        state.pop('_frame_rgba', None)
+        state.pop('_frame_image', None)
+        state.pop('_last_rendered', None)
+        state.pop('_draw_frame', None)
+        state.pop('_draw_pixels', None)
+        state.pop('_rasterize_svg', None)
+        return state
     
 
     
-    def _render_lottie_frame(self, lottie_animation, frame_num: int, total_frames: int) -> Image.Image:
+    def _resolve_output_size(self, lottie_animation) -> tuple:
+        """Work out the output resolution, keeping the aspect ratio when only one side is given."""
+        native_width, native_height = int(lottie_animation.width), int(lottie_animation.height)
+        if self.width != -1 and self.height != -1:
+            return self.width, self.height
+        if self.width != -1:
+            return self.width, max(1, round(native_height * self.width / native_width))
+        if self.height != -1:
+            return max(1, round(native_width * self.height / native_height)), self.height
+        return native_width, native_height
+
+    def _create_surface(self, lottie_animation, output_size: tuple):
+        """Allocate the cairo surface (or rlottie animation), pixel buffer and SVG buffer that every frame is rendered through."""
+        self._output_size = output_size
+        width, height = output_size
+        if self.backend == 'cairo':
+            self._cairo_surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+            self._cairo_ctx = cairo.Context(self._cairo_surface)
+        elif self.backend == 'rlottie':
+            # rlottie loads the Lottie JSON itself; re-serializing the parsed model keeps
+            # this working for any animation, whether or not it came from a file
+            self._rlottie_animation = rlottie_python.LottieAnimation.from_data(
+                json.dumps(lottie_animation.to_dict()))
+            # rlottie fits the animation into its surface keeping the aspect ratio. Draw at the
+            # smallest size with that ratio covering the output, so a different output ratio
+            # can be stretched to afterwards, like the SVG backends' preserveAspectRatio='none'
+            native_width, native_height = int(lottie_animation.width), int(lottie_animation.height)
+            scale = max(width / native_width, height / native_height)
+            self._rlottie_size = (max(1, round(native_width * scale)), max(1, round(native_height * scale)))
+        if self.backend in ('cairo', 'rlottie'):
+            self._frame_rgba, self._frame_image = self._allocate_frame_buffer(output_size)
+        self._svg_buffer = io.BytesIO()
+        self._last_rendered = None  # (frame_num, SVG digest) of the frame this renderer drew last
+        
+        # Pick the backend's per-frame steps once, so the frame loop doesn't keep re-checking them
+        if self.backend == 'rlottie':
+            self._draw_pixels = self._draw_rlottie_frame
+        else:
+            self._draw_pixels = self._draw_svg_frame
+            self._rasterize_svg = self._rasterize_resvg if self.backend == 'resvg' else self._rasterize_cairo
+        self._draw_frame = self._draw_palette_frame if self.palette else self._draw_pixels
+
+    @staticmethod
+    def _allocate_frame_buffer(output_size: tuple):
+        """
+        Allocate an RGBA frame buffer that is handed to the encoder as-is, plus a PIL image
+        mapped onto the same memory so Pillow's unpremultiplying decoder can write straight into it.
+        """
+        width, height = output_size
+        frame_rgba = np.empty((height, width, 4), dtype=np.uint8)
+        return frame_rgba, Image.frombuffer('RGBA', output_size, frame_rgba, 'raw', 'RGBA', 0, 1)
+
+    def _render_lottie_frame(self, lottie_animation, frame_num: int, total_frames: int,
+                             previous_frame_num: int = None):
         """
-        Render a single frame from Lottie animation directly to an in-memory buffer.
+        Render a single frame from Lottie animation straight to pixels at the output size.
+        
+        Returns an (height, width, 4) RGBA uint8 array. With the cairo and rlottie backends that
+        array is the renderer's shared frame buffer, overwritten by the next call, so it must be
+        encoded (or copied) before rendering another frame.
+        
+        Returns None instead of an array when this renderer just drew previous_frame_num and
+        the new frame's SVG (or, for rlottie, its pixels) is byte-for-byte the same, so the
+        encoder can simply keep the previous picture on screen for longer.
         """
         try:
-            # Step 1: Use io.StringIO to create a buffer for the SVG text data.
-            svg_text_buffer = io.StringIO()
-            export_svg(lottie_animation, svg_text_buffer, frame=frame_num)
-            svg_text = svg_text_buffer.getvalue()
+            return self._draw_frame(lottie_animation, frame_num, previous_frame_num)
+                
+        except Exception as e:
+            logger.warning("Lottie frame rendering failed, using fallback: %s", e)
+            return self._create_fallback_frame(lottie_animation, frame_num, total_frames)
+    
+    def _draw_svg_frame(self, lottie_animation, frame_num: int, previous_frame_num) -> np.ndarray:
+        """Export the frame to SVG and rasterize it; None if the SVG repeats previous_frame_num's."""
+        width, height = self._output_size
 
-            # Step 2: Convert the SVG text (str) into binary data (bytes) for cairosvg.
-            svg_bytes = svg_text.encode('utf-8')
+        # Step 1: Build the frame's SVG with its root sized to the output, so the backend
+        # rasterizes straight at the target resolution (stretching like a resize would).
+        svg_dom = to_svg(lottie_animation, frame_num)
+        svg_root = svg_dom.getroot()
+        svg_root.set('width', str(width))
+        svg_root.set('height', str(height))
+        svg_root.set('preserveAspectRatio', 'none')
 
-            # Step 3: Convert the in-memory SVG bytes to in-memory PNG bytes.
-            png_buffer = io.BytesIO()
-            cairosvg.svg2png(bytestring=svg_bytes, write_to=png_buffer)
-            png_buffer.seek(0) # Rewind the buffer to the beginning
+        # Step 2: Serialize it as compact SVG bytes (no pretty-printing, no str -> bytes copy)
+        # into the buffer left over from the previous frame.
+        svg_buffer = self._svg_buffer
+        svg_buffer.seek(0)
+        svg_buffer.truncate()
+        svg_dom.write(svg_buffer, 'utf-8', True)
 
-            # Step 4: Load the PNG from the binary buffer into a PIL Image.
-            img = Image.open(png_buffer).convert('RGBA')
+        # Skip static stretches: identical SVG means an identical picture
+        if self._is_repeat(svg_buffer.getbuffer(), frame_num, previous_frame_num):
+            return None
 
-            # Resize if needed
-            if self.width != -1 and self.height != -1:
-                img = img.resize((self.width, self.height), Image.LANCZOS)
-                
-            return img
-                
-        except Exception as e:
-            print(f"Warning: Lottie frame rendering failed, using fallback: {e}")
-            return self._create_fallback_frame(lottie_animation, frame_num, total_frames)
+        # Step 3: Rasterize with whichever backend _create_surface bound.
+        return self._rasterize_svg(svg_buffer.getvalue(), width, height)
+    
+    def _draw_rlottie_frame(self, lottie_animation, frame_num: int, previous_frame_num) -> np.ndarray:
+        """Draw the frame with rlottie; None if its pixels repeat previous_frame_num's."""
+        frame = self._rasterize_rlottie(frame_num, *self._rlottie_size)
+        return None if self._is_repeat(frame, frame_num, previous_frame_num) else frame
+    
+    def _is_repeat(self, data, frame_num: int, previous_frame_num) -> bool:
+        """Remember what frame_num looked like and tell whether it matches previous_frame_num, the frame drawn just before."""
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        last_rendered, self._last_rendered = self._last_rendered, (frame_num, digest)
+        return previous_frame_num is not None and last_rendered == (previous_frame_num, digest)
+    
+    def _draw_palette_frame(self, lottie_animation, frame_num: int, previous_frame_num) -> np.ndarray:
+        """Draw the frame with the backend's step, then quantize it for palette mode."""
+        frame = self._draw_pixels(lottie_animation, frame_num, previous_frame_num)
+        return None if frame is None else self._apply_palette(frame)
+    
+    def _apply_palette(self, frame: np.ndarray) -> np.ndarray:
+        """Quantize a frame to 256 colours."""
+        # Back to RGBA so the encoder keeps the alpha; libwebp picks its palette mode by itself
+        return np.asarray(Image.fromarray(frame).quantize(colors=256, method=Image.Quantize.FASTOCTREE,
+                                                          dither=Image.Dither.NONE).convert('RGBA'))
     
-    def _create_fallback_frame(self, lottie_animation, frame_num: int, total_frames: int) -> Image.Image:
+    def _rasterize_resvg(self, svg_bytes: bytes, width: int, height: int) -> np.ndarray:
+        """Rasterize SVG bytes with resvg; the SVG root already carries the output size."""
+        png_bytes = resvg_py.svg_to_bytes(svg_string=svg_bytes.decode('utf-8'))
+        img = Image.open(io.BytesIO(png_bytes))
+        # resvg already writes RGBA PNGs; convert() would only make a full copy of the frame
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+        return np.asarray(img)
+    
+    def _rasterize_cairo(self, svg_bytes: bytes, width: int, height: int) -> np.ndarray:
+        """Draw SVG bytes into the shared cairo surface and unpack the pixels into the shared frame buffer."""
+        # Clear the surface left over from the previous frame
+        ctx = self._cairo_ctx
+        ctx.save()
+        ctx.set_operator(cairo.OPERATOR_CLEAR)
+        ctx.paint()
+        ctx.restore()
+
+        surface = self._cairo_surface
+        _RasterSurface(cairosvg.parser.Tree(bytestring=svg_bytes), surface, width, height)
+        surface.flush()
+
+        # Unpremultiply and swizzle cairo's BGRA into the RGBA frame buffer in one pass.
+        # That buffer is what the encoder reads, so no PIL -> numpy copy is made afterwards.
+        self._frame_image.frombytes(surface.get_data(), 'raw', 'BGRa', surface.get_stride(), 1)
+        return self._frame_rgba
+    
+    def _rasterize_rlottie(self, frame_num: int, width: int, height: int) -> np.ndarray:
+        """
+        Have rlottie draw the frame natively at width x height and unpack the pixels into the
+        shared frame buffer, stretching them to the output size when that has another aspect ratio.
+        """
+        # Like cairo, rlottie hands back premultiplied BGRA
+        stride = width * 4
+        pixels = self._rlottie_animation.lottie_animation_render(frame_num, stride * height, width, height, stride)
+        if (width, height) == self._output_size:
+            self._frame_image.frombytes(pixels, 'raw', 'BGRa', stride, 1)
+        else:
+            img = Image.frombuffer('RGBA', (width, height), pixels, 'raw', 'BGRa', stride, 1)
+            self._frame_rgba[...] = np.asarray(img.resize(self._output_size, Image.BICUBIC))
+        return self._frame_rgba
+    
+    def _create_fallback_frame(self, lottie_animation, frame_num: int, total_frames: int) -> np.ndarray:
         """Create a simple fallback frame when Lottie rendering fails."""
-        # Create a simple animated frame with PIL
-        fallback_width = self.width if self.width != -1 else lottie_animation.width
-        fallback_height = self.height if self.height != -1 else lottie_animation.height
-        img = Image.new('RGBA', (fallback_width, fallback_height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
+        # Create a simple animated frame, drawn directly at the output size
+        fallback_width, fallback_height = self._resolve_output_size(lottie_animation)
         
         # Calculate animation progress
         progress = frame_num / max(total_frames - 1, 1)
@@ -83,15 +459,140 @@ class TGSToWebPConverter:
         center_y = int(fallback_height * 0.5)
         radius = int(30 + 20 * abs(0.5 - progress) * 2)
         
-        # Draw a circle
+        # Draw a circle with one vectorized distance test instead of ImageDraw's scalar rasterizer
         color = (51, 153, 255, 200)  # Blue with transparency
-        draw.ellipse([center_x - radius, center_y - radius, 
-                     center_x + radius, center_y + radius], fill=color)
+        yy, xx = np.ogrid[:fallback_height, :fallback_width]
+        pixels = np.zeros((fallback_height, fallback_width, 4), dtype=np.uint8)
+        pixels[(xx - center_x) ** 2 + (yy - center_y) ** 2 <= radius * radius] = color
         
-        return img
+        return pixels
     
 
     
+    def _render_in_background(self, lottie_animation, frame_indices: list, previous_indices: list, total_frames: int):
+        """
+        Render frames on a helper thread and yield them in order.
+        
+        The encoder consumes frames on the calling thread while the next ones are being
+        rasterized; cairo, rlottie and libwebp all release the GIL while they work. At most
+        2 x cpu_count frames wait in the queue, so memory stays bounded if encoding falls behind.
+        """
+        max_queued = 2 * (os.cpu_count() or 1)
+        frame_queue = queue.Queue(maxsize=max_queued)
+        stop = threading.Event()
+        
+        # Backends that draw into the shared frame buffer take turns over a ring of them
+        # instead, so frames can be queued without copying. max_queued + 2 covers every
+        # frame that can be waiting, in the encoder's hands or being drawn at the same time.
+        buffers = None
+        if self.backend in ('cairo', 'rlottie'):
+            ring_size = min(max_queued + 2, len(frame_indices))
+            buffers = [(self._frame_rgba, self._frame_image)]
+            buffers += [self._allocate_frame_buffer(self._output_size) for _ in range(ring_size - 1)]
+        done = object()  # None is already taken: it means "same picture as the previous frame"
+        errors = []
+        
+        def put(item):
+            # Give up once the consumer is gone, instead of blocking on a full queue forever
+            while not stop.is_set():
+                try:
+                    frame_queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+        
+        def produce():
+            try:
+                for i, (original_frame, previous_frame) in enumerate(zip(frame_indices, previous_indices)):
+                    if stop.is_set():
+                        break
+                    if buffers:
+                        self._frame_rgba, self._frame_image = buffers[i % len(buffers)]
+                    put(self._render_lottie_frame(lottie_animation, original_frame, total_frames, previous_frame))
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                put(done)
+        
+        producer = threading.Thread(target=produce, name="tgs-frame-renderer", daemon=True)
+        producer.start()
+        try:
+            while (frame := frame_queue.get()) is not done:
+                yield frame
+        finally:
+            stop.set()
+            producer.join()
+        if errors:
+            raise errors[0]
+    
+    def _create_webp_config(self) -> webp.WebPConfig:
+        """Build the libwebp encoder settings from the converter options, reusing this thread's copy if there is one."""
+        lossless = self.lossless or self.palette
+        key = (self.preset, self.quality, lossless, self.method, self.autofilter, self.thread_level,
+               self.filter_strength, self.alpha_quality)
+        configs = getattr(_ENCODER_TLS, 'configs', None)
+        if configs is None:
+            configs = _ENCODER_TLS.configs = {}
+        config = configs.get(key)
+        if config is None:
+            config = webp.WebPConfig.new(preset=_WEBP_PRESETS[self.preset], quality=self.quality,
+                                         lossless=lossless, method=self.method)
+            config.ptr.autofilter = int(self.autofilter)
+            if self.filter_strength is not None:
+                config.ptr.filter_strength = int(self.filter_strength)
+            config.ptr.alpha_quality = int(self.alpha_quality)
+            webp.ffi.cast('int *', config.ptr)[_WEBP_CONFIG_THREAD_LEVEL_INDEX] = int(self.thread_level)
+            if not config.validate():
+                raise ValueError("Invalid WebP encoder settings (check method, thread_level, filter_strength and alpha_quality)")
+            configs[key] = config
+        return config
+    
+    def _create_anim_options(self) -> webp.WebPAnimEncoderOptions:
+        """Build the animation-level libwebp options: mixed/minimized encoding and key frame spacing."""
+        options = webp.WebPAnimEncoderOptions.new(minimize_size=self.minimize_size, allow_mixed=self.allow_mixed)
+        if self.kmin is not None:
+            options.ptr.kmin = int(self.kmin)
+        if self.kmax is not None:
+            options.ptr.kmax = int(self.kmax)
+        return options
+    
+    def _encode_still(self, frame: np.ndarray, output_size: tuple, webp_path: str):
+        """Encode a single frame as a static WebP and write it."""
+        picture = webp.WebPPicture.new(*output_size)
+        _import_rgba(picture, frame)
+        _write_output(webp_path, picture.encode(self._create_webp_config()).buffer())
+    
+    def _encode_frames(self, frames, output_size: tuple, webp_path: str, total_frames: int):
+        """
+        Feed frames to libwebp's animation encoder as they arrive and write the result.
+        
+        Each frame is dropped as soon as it is encoded, so only a handful of
+        rendered frames are ever held in memory at once.
+        """
+        encoder = webp.WebPAnimEncoder.new(*output_size, self._create_anim_options())
+        config = self._create_webp_config()
+        # One WebPPicture for every frame: the encoder copies each one in, so only the
+        # pixel import has to run per frame
+        picture = webp.WebPPicture.new(*output_size)
+        progress_step = max(1, total_frames // 20)
+        
+        frame_count = 0
+        for frame in frames:
+            # None means "same picture as the previous frame": leave it on screen longer
+            if frame is not None:
+                timestamp_ms = round(frame_count * 1000 / self._calculated_fps)
+                _import_rgba(picture, frame)
+                encoder.encode_frame(picture, timestamp_ms, config)
+            frame_count += 1
+            if frame_count % progress_step == 0:
+                logger.debug("Encoded %d/%d frames", frame_count, total_frames)
+        
+        if not frame_count:
+            raise ValueError("No frames could be rendered from TGS file")
+        
+        anim_data = encoder.assemble(round(frame_count * 1000 / self._calculated_fps))
+        _write_output(webp_path, anim_data.buffer())
+    
     def convert(self, tgs_path: str, webp_path: str) -> bool:
         """
         Convert TGS file to animated WebP.
@@ -108,14 +609,33 @@ class TGSToWebPConverter:
             ValueError: If TGS file is invalid
             IOError: If output file cannot be written
         """
-        start_time = time.monotonic()
         if not os.path.exists(tgs_path):
             raise FileNotFoundError(f"TGS file not found: {tgs_path}")
+        return self._convert(webp_path, tgs_path=tgs_path)
+    
+    def convert_animation(self, lottie_animation, webp_path: str) -> bool:
+        """
+        Convert an already-parsed Lottie animation (e.g. from load_tgs) to animated WebP.
         
+        Args:
+            lottie_animation: lottie.objects.Animation to convert
+            webp_path: Path to output WebP file
+            
+        Returns:
+            True if conversion successful
+            
+        Raises:
+            IOError: If the animation cannot be rendered or the output file cannot be written
+        """
+        return self._convert(webp_path, lottie_animation=lottie_animation)
+    
+    def _convert(self, webp_path: str, tgs_path: str = None, lottie_animation=None) -> bool:
+        """Shared body of convert() and convert_animation(); the TGS is only parsed when no animation is given."""
+        start_time = time.monotonic()
         try:
-            # Parse TGS file using lottie library
-            with open(tgs_path, 'rb') as f:
-                lottie_animation = parse_tgs(f)
+            if lottie_animation is None:
+                # Parse TGS file using lottie library
+                lottie_animation = load_tgs(tgs_path)
             
             # Get animation properties
             original_total_frames = int(lottie_animation.out_point - lottie_animation.in_point) if lottie_animation else 30
@@ -132,12 +652,14 @@ class TGSToWebPConverter:
                     # For short animations, keep all frames and adjust FPS to maintain duration
                     total_frames = original_total_frames
                     output_fps = total_frames / original_duration
-                    print(f"Preserving all {total_frames} frames, adjusting FPS to {output_fps:.1f} to maintain {original_duration:.2f}s duration")
+                    logger.info("Preserving all %d frames, adjusting FPS to %.1f to maintain %.2fs duration",
+                                total_frames, output_fps, original_duration)
                 else:
                     # For long animations, limit frames but maintain duration
                     total_frames = max_frames
                     output_fps = total_frames / original_duration
-                    print(f"Limiting to a total of {max_frames} frames, adjusting FPS to {output_fps:.1f} to maintain {original_duration:.2f}s duration")
+                    logger.info("Limiting to a total of %d frames, adjusting FPS to %.1f to maintain %.2fs duration",
+                                max_frames, output_fps, original_duration)
                 
                 # Store the calculated FPS for frame duration calculation
                 self._calculated_fps = output_fps
@@ -147,29 +669,61 @@ class TGSToWebPConverter:
                 max_frames = 180
                 if total_frames > max_frames:
                     total_frames = max_frames
-                    print(f"Limiting animation to a total of {max_frames} frames for performance")
+                    logger.info("Limiting animation to a total of %d frames for performance", max_frames)
                 self._calculated_fps = self.fps
             
-            # Render all frames
-            frames = []
-            for i in range(total_frames):
-                # Map our frame index to the original animation frame range
-                original_frame = int(i * original_total_frames / total_frames)
-                frame = self._render_lottie_frame(lottie_animation, original_frame, total_frames)
-                frames.append(frame)
+            output_size = self._resolve_output_size(lottie_animation)
             
-            if not frames:
-                raise ValueError("No frames could be rendered from TGS file")
+            # Map our frame indices to the original animation frame range, in one vectorized
+            # integer pass (same frames as int(i * original / total), without float rounding)
+            frame_indices = (np.arange(total_frames) * original_total_frames // total_frames).tolist()
+            previous_indices = [None] + frame_indices[:-1]
             
-            # Calculate frame duration in milliseconds using the calculated FPS
+            if total_frames == 1:
+                # Stills don't need the animation encoder (or its per-frame container overhead)
+                self._create_surface(lottie_animation, output_size)
+                frame = self._render_lottie_frame(lottie_animation, frame_indices[0], total_frames)
+                self._encode_still(frame, output_size, webp_path)
+                return True
             
-            # Save as animated WebP
-            webp.save_images(
-                frames, 
-                webp_path, 
-                fps=self._calculated_fps, 
-                quality=self.quality
-            )
+            # Render all frames, spreading them over all cores when there are enough of them,
+            # and stream each one into the WebP encoder as soon as it is ready. Either way
+            # rendering runs alongside encoding rather than taking turns with it.
+            workers = min(os.cpu_count() or 1, total_frames // _MIN_FRAMES_PER_WORKER)
+            if workers <= 1:
+                self._create_surface(lottie_animation, output_size)
+                frames = self._render_in_background(lottie_animation, frame_indices, previous_indices, total_frames)
+                try:
+                    self._encode_frames(frames, output_size, webp_path, total_frames)
+                finally:
+                    frames.close()  # Stops the render thread right away if encoding failed
+            else:
+                # Forked workers share this process's parsed animation for free; anything else
+                # (spawn, forkserver) has to load it again from the path or a plain dict
+                mp_context = multiprocessing.get_context()
+                if self.backend == 'rlottie' and mp_context.get_start_method() == 'fork':
+                    # rlottie's render threads don't survive a fork: once this process has drawn
+                    # with rlottie (stills, short stickers), forked workers deadlock in
+                    # lottie_animation_render. Start them as fresh interpreters instead.
+                    mp_context = multiprocessing.get_context('spawn')
+                if mp_context.get_start_method() == 'fork':
+                    source = None
+                else:
+                    source = tgs_path or lottie_animation.to_dict()
+                global _shared_animation
+                _shared_animation = lottie_animation
+                try:
+                    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=_init_render_worker,
+                                             initargs=(source, self, output_size)) as executor:
+                        frames = _iter_pool_frames(executor, frame_indices, previous_indices, total_frames,
+                                                   chunksize=max(1, total_frames // (4 * workers)),
+                                                   max_in_flight=2 * workers)
+                        try:
+                            self._encode_frames(frames, output_size, webp_path, total_frames)
+                        finally:
+                            frames.close()  # Cancels pending chunks before the pool waits on them
+                finally:
+                    _shared_animation = None
                         
             return True
             
@@ -179,22 +733,40 @@ class TGSToWebPConverter:
         finally:
             end_time = time.monotonic()
             duration = end_time - start_time
-            print(f"⌛ Total time taken: {duration:.2f} seconds.")
+            logger.info("⌛ Total time taken: %.2f seconds.", duration)
 
-def convert_tgs_to_webp(tgs_path: str, webp_path: str, 
+def convert_tgs_to_webp(tgs_path, webp_path: str, 
                        width: int = -1, height: int = -1, 
-                       fps: int = 30, quality: int = 80, preserve_timing: bool = True) -> bool:
+                       fps: int = 30, quality: int = 80, preserve_timing: bool = True,
+                       palette: bool = False, backend: str = 'auto', method: int = 0,
+                       thread_level: int = 1, lossless: bool = False, autofilter: bool = False,
+                       preset: str = 'default', filter_strength: int = None,
+                       allow_mixed: bool = False, alpha_quality: int = 100, minimize_size: bool = False,
+                       kmin: int = None, kmax: int = None) -> bool:
     """
     Simple function to convert TGS to WebP with automatic timing preservation.
     
     Args:
-        tgs_path: Path to input TGS file
+        tgs_path: Path to input TGS file, or an already-parsed Lottie animation (see load_tgs)
         webp_path: Path to output WebP file
         width: Output width in pixels (default: Original)
         height: Output height in pixels (default: Original)
         fps: Target frames per second (ignored if preserve_timing=True, default: 30)
         quality: WebP quality 0-100 (default: 80)
         preserve_timing: Automatically preserve original animation timing (default: True)
+        palette: Quantize frames to 256 colours and encode losslessly (default: False)
+        backend: Frame renderer, 'auto', 'cairo', 'resvg' or 'rlottie' (default: 'auto', rlottie if installed)
+        method: WebP compression effort 0 (fast) - 6 (small) (default: 0)
+        thread_level: Multi-threaded libwebp encoding, 1 on / 0 off (default: 1)
+        lossless: Encode losslessly (default: False)
+        autofilter: Auto-tune the lossy deblocking filter, 3-5x slower encodes (default: False)
+        preset: libwebp preset name, e.g. 'sticker' (default: 'default')
+        filter_strength: Lossy deblocking filter strength 0-100 (default: None, the preset's)
+        allow_mixed: Let libwebp choose lossy or lossless per frame (default: False)
+        alpha_quality: Lossy alpha plane quality 0-100 (default: 100)
+        minimize_size: Search harder for the smallest animation, much slower (default: False)
+        kmin: Minimum key frame distance (default: None, libwebp's)
+        kmax: Maximum key frame distance (default: None, libwebp's)
         
     Returns:
         True if conversion successful, False otherwise
@@ -206,11 +778,17 @@ def convert_tgs_to_webp(tgs_path: str, webp_path: str,
         >>> # Manual FPS control
         >>> success = convert_tgs_to_webp('sticker.tgs', 'sticker.webp', fps=20, preserve_timing=False)
     """
-    converter = TGSToWebPConverter(width, height, fps, quality, preserve_timing)
     try:
-        return converter.convert(tgs_path, webp_path)
+        converter = TGSToWebPConverter(width, height, fps, quality, preserve_timing, palette, backend,
+                                       method=method, thread_level=thread_level, lossless=lossless,
+                                       autofilter=autofilter, preset=preset, filter_strength=filter_strength,
+                                       allow_mixed=allow_mixed, alpha_quality=alpha_quality,
+                                       minimize_size=minimize_size, kmin=kmin, kmax=kmax)
+        if isinstance(tgs_path, (str, os.PathLike)):
+            return converter.convert(tgs_path, webp_path)
+        return converter.convert_animation(tgs_path, webp_path)
     except Exception as e:
-        print(f"Error during conversion: {e}")
+        logger.error("Error during conversion: %s", e)
         return False
 
 
@@ -239,9 +817,35 @@ if __name__ == "__main__":
     # This is a cool way to handle a boolean flag
     parser.add_argument("--no-preserve-timing", action="store_false", dest="preserve_timing",
                         help="Disable automatic timing preservation to use the manual FPS value.")
+    parser.add_argument("--palette", action="store_true",
+                        help="Quantize frames to a 256-colour palette and encode losslessly.")
+    parser.add_argument("--backend", choices=("auto", "cairo", "resvg", "rlottie"), default="auto",
+                        help="Frame renderer. 'resvg' is much faster than cairo but needs `pip install resvg_py`; "
+                             "'rlottie' skips SVG entirely and is fastest, but needs `pip install rlottie-python`. "
+                             "Default: auto (rlottie when installed, cairo otherwise).")
+    parser.add_argument("--method", "--encode-method", type=int, default=0, choices=range(7), metavar="{0-6}",
+                        help="WebP compression effort. 0-3 favour speed, 4-6 favour smaller files. Default: 0.")
+    parser.add_argument("--thread-level", type=int, default=1, choices=(0, 1),
+                        help="Let libwebp use extra threads while encoding. Default: 1.")
+    parser.add_argument("--lossless", action="store_true", help="Encode losslessly.")
+    parser.add_argument("--autofilter", action=argparse.BooleanOptionalAction, default=False,
+                        help="Let libwebp auto-tune the deblocking filter (encodes 3-5x slower). Default: off.")
+    parser.add_argument("--filter-strength", type=int, default=None, choices=range(101), metavar="{0-100}",
+                        help="Lossy deblocking filter strength (0 = off). Default: the preset's.")
+    parser.add_argument("--allow-mixed", action="store_true",
+                        help="Let libwebp pick lossy or lossless per frame, whichever is smaller (slower).")
+    parser.add_argument("--alpha-quality", type=int, default=100, choices=range(101), metavar="{0-100}",
+                        help="Quality of the lossy alpha plane. Default: 100.")
+    parser.add_argument("--minimize-size", action="store_true",
+                        help="Search harder for the smallest animation (much slower).")
+    parser.add_argument("--kmin", type=int, default=None, help="Minimum distance between key frames. Default: libwebp's.")
+    parser.add_argument("--kmax", type=int, default=None, help="Maximum distance between key frames. Default: libwebp's.")
+    parser.add_argument("--preset", default="default", choices=tuple(_WEBP_PRESETS),
+                        help="libwebp preset to start from ('sticker' = 'icon'). Default: default.")
 
     # Let argparse handle the arguments
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
 
     # Call the main function with the parsed arguments
     success = convert_tgs_to_webp(
@@ -251,7 +855,20 @@ if __name__ == "__main__":
         height=args.height,
         quality=args.quality,
         fps=args.fps,
-        preserve_timing=args.preserve_timing
+        preserve_timing=args.preserve_timing,
+        palette=args.palette,
+        backend=args.backend,
+        method=args.method,
+        thread_level=args.thread_level,
+        lossless=args.lossless,
+        autofilter=args.autofilter,
+        preset=args.preset,
+        filter_strength=args.filter_strength,
+        allow_mixed=args.allow_mixed,
+        alpha_quality=args.alpha_quality,
+        minimize_size=args.minimize_size,
+        kmin=args.kmin,
+        kmax=args.kmax
     )
 
     if success:
@@ -9,16 +9,37 @@ import os
 import io
 import webp
 import time
-from PIL import Image, ImageDraw
-from lottie.exporters.svg import export_svg
+import cairocffi as cairo
+import numpy as np
+import PIL
+from PIL import Image
 from lottie.parsers.tgs import parse_tgs
+from lottie.parsers.svg.builder import to_svg
 from lottie.exporters.cairo import cairosvg
 
 
+# Pillow-SIMD (versioned like 9.5.0.post1) vectorizes LANCZOS, which then costs about as
+# much as BICUBIC does on stock Pillow
+_PILLOW_SIMD = '.post' in PIL.__version__
+
+
+class _RasterSurface(cairosvg.surface.PNGSurface):
+    """cairosvg surface that draws into an existing cairo ImageSurface instead of encoding a PNG."""
+
+    def __init__(self, tree, target, width: int, height: int):
+        self._target = target
+        # output=None keeps cairosvg from writing anything; the pixels stay on the target surface.
+        super().__init__(tree, None, 96, output_width=width, output_height=height)
+
+    def _create_surface(self, width, height):
+        return self._target, self._target.get_width(), self._target.get_height()
+
+
 class TGSToWebPConverter:
     """Converter class for TGS to WebP conversion with automatic timing preservation."""
     
-    def __init__(self, width: int = -1, height: int = -1, fps: int = 30, quality: int = 80, preserve_timing: bool = True):
+    def __init__(self, width: int = -1, height: int = -1, fps: int = 30, quality: int = 80, preserve_timing: bool = True,
+                 resample: int = None):
         """
         Initialize the converter.
         
@@ -28,39 +49,58 @@ class TGSToWebPConverter:
             fps: Target frames per second (ignored if preserve_timing=True)
             quality: WebP quality (0-100)
             preserve_timing: Preserves original fps and timing
+            resample: Pillow filter for frames that still need resizing (when the requested size
+                      has a different aspect ratio than the animation). None picks Image.LANCZOS
+                      on Pillow-SIMD and Image.BICUBIC otherwise, which is about a third cheaper
+                      on stock Pillow and looks the same once WebP-compressed.
         """
         self.width = width
         self.height = height
         self.fps = fps
         self.quality = quality
         self.preserve_timing = preserve_timing
+        if resample is None:
+            resample = Image.LANCZOS if _PILLOW_SIMD else Image.BICUBIC
+        self.resample = resample
     
 
     
     def _render_lottie_frame(self, lottie_animation, frame_num: int, total_frames: int) -> Image.Image:
         """
-        Render a single frame from Lottie animation directly to an in-memory buffer.
+        Render a single frame from Lottie animation directly to pixels in memory.
         """
         try:
-            # Step 1: Use io.StringIO to create a buffer for the SVG text data.
-            svg_text_buffer = io.StringIO()
-            export_svg(lottie_animation, svg_text_buffer, frame=frame_num)
-            svg_text = svg_text_buffer.getvalue()
-
-            # Step 2: Convert the SVG text (str) into binary data (bytes) for cairosvg.
-            svg_bytes = svg_text.encode('utf-8')
+            # Step 1: Build the frame's SVG tree and serialize it straight to UTF-8 bytes,
+            # with no SVG text (str) round-trip in between.
+            svg_buffer = io.BytesIO()
+            to_svg(lottie_animation, frame_num).write(svg_buffer, 'utf-8', True)
 
-            # Step 3: Convert the in-memory SVG bytes to in-memory PNG bytes.
-            png_buffer = io.BytesIO()
-            cairosvg.svg2png(bytestring=svg_bytes, write_to=png_buffer)
-            png_buffer.seek(0) # Rewind the buffer to the beginning
+            # Step 2: Draw the SVG onto a cairo surface.
+            # When the output keeps the animation's aspect ratio, cairo rasterizes straight at
+            # the output size instead of drawing pixels a resize would throw away. (cairosvg
+            # letterboxes a different ratio, so those are still stretched by the resize below.)
+            render_width, render_height = int(lottie_animation.width), int(lottie_animation.height)
+            resize = self.width != -1 and self.height != -1
+            if resize and self.width * lottie_animation.height == self.height * lottie_animation.width:
+                render_width, render_height = self.width, self.height
+            surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, render_width, render_height)
+            _RasterSurface(cairosvg.parser.Tree(bytestring=svg_buffer.getvalue()), surface,
+                           render_width, render_height)
+            surface.flush()
 
-            # Step 4: Load the PNG from the binary buffer into a PIL Image.
-            img = Image.open(png_buffer).convert('RGBA')
+            # Step 3: Read the surface's premultiplied BGRA pixels into a PIL Image (no PNG
+            # encode/decode); the 'BGRa' decoder unpremultiplies and copies them out.
+            img = Image.frombuffer('RGBA', (render_width, render_height), surface.get_data(),
+                                   'raw', 'BGRa', surface.get_stride(), 1)
 
             # Resize if needed
-            if self.width != -1 and self.height != -1:
-                img = img.resize((self.width, self.height), Image.LANCZOS)
+            if resize and img.size != (self.width, self.height):
+                # Box-average away whole multiples first (cheap, and the right prefilter for
+                # integer factors), so LANCZOS only has the small remaining scale left to do
+                factor = min(img.width // self.width, img.height // self.height)
+                if factor >= 2:
+                    img = img.reduce(factor)
+                img = img.resize((self.width, self.height), self.resample)
                 
             return img
                 
@@ -70,11 +110,9 @@ class TGSToWebPConverter:
     
     def _create_fallback_frame(self, lottie_animation, frame_num: int, total_frames: int) -> Image.Image: #It will create a dummy frame to prevent failure
         """Create a simple fallback frame when Lottie rendering fails."""
-        # Create a simple animated frame with PIL 
-        fallback_width = self.width if self.width != -1 else lottie_animation.width
-        fallback_height = self.height if self.height != -1 else lottie_animation.height
-        img = Image.new('RGBA', (fallback_width, fallback_height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
+        # Create a simple animated frame
+        fallback_width = self.width if self.width != -1 else int(lottie_animation.width)
+        fallback_height = self.height if self.height != -1 else int(lottie_animation.height)
         
         # Calculate animation progress
         progress = frame_num / max(total_frames - 1, 1)
@@ -84,12 +122,13 @@ class TGSToWebPConverter:
         center_y = int(fallback_height * 0.5)
         radius = int(30 + 20 * abs(0.5 - progress) * 2)
         
-        # Draw a circle
+        # Draw a circle with one vectorized distance test instead of ImageDraw's scalar rasterizer
         color = (51, 153, 255, 200)  # Blue with transparency
-        draw.ellipse([center_x - radius, center_y - radius, 
-                     center_x + radius, center_y + radius], fill=color)
+        yy, xx = np.ogrid[:fallback_height, :fallback_width]
+        pixels = np.zeros((fallback_height, fallback_width, 4), dtype=np.uint8)
+        pixels[(xx - center_x) ** 2 + (yy - center_y) ** 2 <= radius * radius] = color
         
-        return img
+        return Image.fromarray(pixels)
     
 
     
@@ -131,24 +170,25 @@ class TGSToWebPConverter:
             else:
                 print(f"Adjusting frames per second to {self.fps}")
             
-            # Render all frames
-            frames = []
+            # Render all frames, handing each one straight to libwebp's animation encoder
+            # so only a single frame is held in memory at a time
+            encoder = None
+            config = webp.WebPConfig.new(quality=self.quality)
             for i in range(total_frames):
                 # Map our frame index to the original animation frame range
                 frame = i
                 frame = self._render_lottie_frame(lottie_animation, frame, total_frames)
-                frames.append(frame)
+                if encoder is None:
+                    encoder = webp.WebPAnimEncoder.new(frame.width, frame.height)
+                encoder.encode_frame(webp.WebPPicture.from_pil(frame), round(i * 1000 / self.fps), config)
             
-            if not frames:
+            if encoder is None:
                 raise ValueError("No frames could be rendered from TGS file")
                         
             # Save as animated WebP
-            webp.save_images(
-                frames, 
-                webp_path, 
-                fps=self.fps, 
-                quality=self.quality
-            )
+            anim_data = encoder.assemble(round(total_frames * 1000 / self.fps))
+            with open(webp_path, 'wb') as f:
+                f.write(anim_data.buffer())
             
             return True
             
@@ -163,7 +203,8 @@ class TGSToWebPConverter:
 
 def convert_tgs_to_webp(tgs_path: str, webp_path: str, 
                        width: int = -1, height: int = -1, 
-                       fps: int = 30, quality: int = 80, preserve_timing: bool = True) -> bool:
+                       fps: int = 30, quality: int = 80, preserve_timing: bool = True,
+                       resample: int = None) -> bool:
     """
     Simple function to convert TGS to WebP with automatic timing preservation.
     
@@ -175,6 +216,7 @@ def convert_tgs_to_webp(tgs_path: str, webp_path: str,
         fps: Target frames per second (ignored if preserve_timing=True, default: 30)
         quality: WebP quality 0-100 (default: 80)
         preserve_timing: Automatically preserve original animation timing (default: True)
+        resample: Pillow resize filter (default: None, LANCZOS on Pillow-SIMD, BICUBIC otherwise)
         
     Returns:
         True if conversion successful, False otherwise
@@ -186,7 +228,7 @@ def convert_tgs_to_webp(tgs_path: str, webp_path: str,
         >>> # Manual FPS control
         >>> success = convert_tgs_to_webp('sticker.tgs', 'sticker.webp', fps=20, preserve_timing=False)
     """
-    converter = TGSToWebPConverter(width, height, fps, quality, preserve_timing)
+    converter = TGSToWebPConverter(width, height, fps, quality, preserve_timing, resample)
     try:
         return converter.convert(tgs_path, webp_path)
     except Exception as e:
@@ -8,14 +8,188 @@ TGS files are gzip-compressed Lottie JSON animations.
 """
 
 import os 
-import tempfile
 import io
-from PIL import Image, ImageDraw
+import atexit
+from PIL import Image
 from lottie.parsers.tgs import parse_tgs
 from lottie.exporters.cairo import cairosvg
-from lottie.exporters.svg import export_svg
+from lottie.parsers.svg.builder import to_svg
 import time
+import queue
+import functools
+import threading
 import webp
+import cairocffi as cairo
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Each worker pays for a TGS parse (once per file) and a round trip per batch of frames, so it
+# must have at least this many frames to render; below 2x this, everything stays in one process
+_MIN_FRAMES_PER_WORKER = 4
+
+# Search ranges spanning at most this many steps are scanned linearly from the top instead
+# of bisected: the first value that fits is then the largest one, with no midpoint overshoot
+_LINEAR_SCAN_MAX_SPAN = 4
+
+# A search that lands under the target band this many probes in a row already holds a
+# fitting value and has narrowed down to the top eighth of its range; it stops refining there
+_MAX_UNDERSHOOTS = 3
+
+# Position of thread_level in libwebp's WebPConfig (encode.h). The webp binding does not
+# declare that field, so it is written through a raw int view; every field is 4 bytes wide.
+_WEBP_CONFIG_THREAD_LEVEL_INDEX = 21
+
+# Every probe is a candidate output file and the winner's bytes are saved as they are, so probes
+# use the method the output should have. libwebp's balanced 4: method 0 comes out about a third
+# bigger (the search then settles too low), and re-encoding the winner at 6 costs far more than
+# the whole search.
+_ENCODE_METHOD = 4
+
+# A candidate the size model puts this far (relative to the middle of the target band) above
+# the band is taken as too big without encoding it
+_MODEL_SKIP_RATIO = 0.4
+
+# Stage D is skipped when a single frame at its quality is known to come out more than this
+# many times the size cap: fewer frames can't help then, only Stage E's lower qualities can
+_INFEASIBLE_RATIO = 2
+
+# Largest radius the fallback frame's circle is drawn with (see _create_fallback_frame)
+_FALLBACK_MAX_RADIUS = 50
+
+# Squared distance of every pixel around the fallback circle's centre, out to its largest
+# radius; each fallback frame only compares a slice of it
+_FALLBACK_OFFSETS = np.arange(-_FALLBACK_MAX_RADIUS, _FALLBACK_MAX_RADIUS + 1, dtype=np.int32)
+_FALLBACK_DISK = _FALLBACK_OFFSETS[:, None] ** 2 + _FALLBACK_OFFSETS ** 2
+
+# Frame rendering pool shared by every conversion in this process, see _get_render_pool
+_render_pool = None
+
+
+def _parse_tgs_file(tgs_path: str, mtime_ns: int, size: int):
+    # mtime_ns and size are only there to key the caches below
+    with open(tgs_path, 'rb') as f:
+        return parse_tgs(f)
+
+
+# The converting process keeps recent files around for re-conversions. Pool workers outlive
+# every conversion, so each of them only keeps the files it is rendering right now.
+_parse_tgs_cached = functools.lru_cache(maxsize=32)(_parse_tgs_file)
+_parse_tgs_in_worker = functools.lru_cache(maxsize=2)(_parse_tgs_file)
+
+
+def _load_animation(tgs_path: str, parse=_parse_tgs_cached):
+    """
+    Parse a TGS file into a Lottie animation, cached on (path, mtime, size) so converting
+    the same unchanged file again (e.g. with another quality) skips the gzip + JSON parse.
+    """
+    stat = os.stat(tgs_path)
+    return parse(os.path.abspath(tgs_path), stat.st_mtime_ns, stat.st_size)
+
+
+class _RasterSurface(cairosvg.surface.PNGSurface):
+    """cairosvg surface that draws into an existing cairo ImageSurface instead of encoding a PNG."""
+
+    def __init__(self, tree, target, width: int, height: int):
+        self._target = target
+        # output=None keeps cairosvg from writing anything; the pixels stay on the target surface.
+        super().__init__(tree, None, 96, output_width=width, output_height=height)
+
+    def _create_surface(self, width, height):
+        return self._target, self._target.get_width(), self._target.get_height()
+
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    """
+    Return the process pool frames are rendered on, starting it on first use.
+    
+    The pool lives until shutdown_render_pool(), so converting a batch of stickers starts
+    its workers only once. Tasks carry the TGS path rather than the animation (lottie objects
+    can't be pickled); each worker keeps what it parsed in _parse_tgs_in_worker's cache.
+    """
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _render_pool
+
+
+def shutdown_render_pool():
+    """
+    Stop the worker processes of the shared frame rendering pool, if it is running.
+    
+    Runs at interpreter exit; long-running applications can call it once they are done
+    converting to free the workers' memory. The next conversion starts a fresh pool.
+    """
+    global _render_pool
+    pool, _render_pool = _render_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(shutdown_render_pool)
+
+
+def _discard_render_pool():
+    """Shut down a pool that broke (e.g. a worker was killed), so the next conversion starts a fresh one."""
+    shutdown_render_pool()
+
+
+@functools.lru_cache(maxsize=4)
+def _worker_converter(width: int, height: int) -> "TGSToWebPConverter":
+    """A pool worker's converter for one output size, kept so its SVG buffer and cairo surface get reused."""
+    return TGSToWebPConverter(width, height)
+
+
+def _render_frames(tgs_path: str, output_size: tuple, frame_nums: list, total_frames: int) -> list:
+    """
+    Render a run of frames inside a pool worker, as raw RGBA pixels (cheaper to send back than Images).
+    
+    Only the requested (width, height) travels with the task: that is all of the converter
+    that rendering depends on.
+    """
+    lottie_animation = _load_animation(tgs_path, _parse_tgs_in_worker)
+    converter = _worker_converter(*output_size)
+    return [np.asarray(converter._render_lottie_frame(lottie_animation, frame_num, total_frames))
+            for frame_num in frame_nums]
+
+
+class _SizeModel:
+    """
+    Straight-line fit of encoded size against the one value a search stage varies (frame
+    count or quality), built from the probes that stage has actually encoded.
+    """
+
+    def __init__(self):
+        self.observations = {}
+
+    def add(self, value: int, size: int):
+        self.observations[value] = size
+
+    def predict(self, value: int):
+        """Least-squares estimate of the size at value, or None until two values were seen."""
+        n = len(self.observations)
+        if n < 2:
+            return None
+        mean_x = sum(self.observations) / n
+        mean_y = sum(self.observations.values()) / n
+        spread = sum((x - mean_x) ** 2 for x in self.observations)
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in self.observations.items()) / spread
+        return mean_y + slope * (value - mean_x)
+
+
+def _predicted_too_big(predicted, target_range: tuple) -> bool:
+    """
+    Whether a size model's prediction is far enough above target_range to skip encoding it.
+    
+    Never true for a size within the cap, whatever _MODEL_SKIP_RATIO is set to: the search
+    may pick any size that fits, and only real encodes can be saved.
+    """
+    if predicted is None or predicted <= target_range[1]:
+        return False
+    target_mid = (target_range[0] + target_range[1]) / 2
+    return predicted - target_mid > _MODEL_SKIP_RATIO * target_mid
+
+
 class TGSToWebPConverter:
     """Converter class for TGS to WebP conversion with automatic timing preservation."""
     
@@ -31,19 +205,50 @@ class TGSToWebPConverter:
         self.width = width
         self.height = height
         self.quality = quality
+        self._create_buffers()
+    
+    def _create_buffers(self):
+        """Allocate the SVG buffer every frame is written through; the cairo surface comes with the first frame."""
+        self._svg_buffer = io.BytesIO()
+        self._surface = None
     
-    def _create_webp_buffer(self, frames, quality, fps):
-        if not frames:
+    def __getstate__(self):
+        # Buffers can't be pickled; pool workers get fresh ones in __setstate__
+        state = self.__dict__.copy()
+        state.pop('_svg_buffer', None)
+        state.pop('_surface', None)
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._create_buffers()
+    
+    def _create_webp_buffer(self, frames, quality, fps, method: int = _ENCODE_METHOD, thread_level: int = 1) -> bytes:
+        """
+        Encode (height, width, 4) RGBA frames as an animated WebP entirely in memory and
+        return the file's bytes. frames may be any iterable, e.g. a generator still rendering them.
+        
+        method is libwebp's compression effort, 0 (fastest) to 6 (smallest); thread_level 1
+        lets libwebp use extra threads inside each frame encode.
+        """
+        config = webp.WebPConfig.new(preset=webp.WebPPreset.DEFAULT, quality=quality, method=method)
+        webp.ffi.cast('int *', config.ptr)[_WEBP_CONFIG_THREAD_LEVEL_INDEX] = thread_level
+        if not config.validate():
+            raise ValueError("Invalid WebP encoder settings")
+
+        # Same encode as webp.save_images, minus its write to disk (and our read back)
+        encoder = None
+        frame_count = 0
+        for frame in frames:
+            if encoder is None:
+                height, width = frame.shape[:2]
+                encoder = webp.WebPAnimEncoder.new(width, height, webp.WebPAnimEncoderOptions.new())
+            encoder.encode_frame(webp.WebPPicture.from_numpy(frame), round(frame_count * 1000 / fps), config)
+            frame_count += 1
+        if encoder is None:
             return None
-
-        # 1. write to a temp file
-        with tempfile.NamedTemporaryFile(suffix=".webp", delete=False) as tmp:
-            webp.save_images(frames, tmp.name, fps=fps, quality=quality)
-            tmp.flush()
-
-            # 2. read that file into BytesIO
-            buf = io.BytesIO(tmp.read())
-        return buf
+        # Copied out: the encoded data is freed along with its WebPData
+        return bytes(encoder.assemble(round(frame_count * 1000 / fps)).buffer())
 
 
     
@@ -53,6 +258,9 @@ class TGSToWebPConverter:
         Performs a binary search to find a value in search_space that results
         in an outcome within target_range.
 
+        Small ranges (see _LINEAR_SCAN_MAX_SPAN) are scanned downwards instead, and the
+        bisection settles for its best fitting value after _MAX_UNDERSHOOTS undershoots in a row.
+
         Args:
             target_range: A (min, max) tuple for the desired outcome (file size).
             search_space: A (min, max) tuple for the values to search (e.g., frame count or quality).
@@ -70,6 +278,14 @@ class TGSToWebPConverter:
         if low > high:
             return None, None
 
+        if high - low <= _LINEAR_SCAN_MAX_SPAN:
+            for value in range(high, max(low, 1) - 1, -1):
+                current_size = evaluator_func(value)
+                if current_size <= target_range[1]:
+                    return value, current_size
+            return None, None
+
+        undershoots = 0
         while low <= high:
             mid = (low + high) // 2
             if mid == 0: # Avoid getting stuck at 0
@@ -80,14 +296,20 @@ class TGSToWebPConverter:
             if target_range[0] <= current_size <= target_range[1]:
                 # Perfect match! We are within our target size bracket.
                 return mid, current_size
-            elif current_size < target_range[0]:
+
+            if current_size < target_range[0]:
                 # The file is too small, try for better quality/more frames.
                 best_value = mid # This is a valid, but small, option
                 best_size = current_size
                 low = mid + 1
+                undershoots += 1
             else:
                 # The file is too big, we must reduce quality/frames.
                 high = mid - 1
+                undershoots = 0
+
+            if undershoots >= _MAX_UNDERSHOOTS:
+                break
         
         # If we never hit the target range exactly, return the best value found that was under the max
         # This is useful if the target range [400, 500] is missed, but we found a solution that is, say, 390KB.
@@ -96,33 +318,101 @@ class TGSToWebPConverter:
              
         return None, None
     
-    def _render_lottie_frame(self, lottie_animation, frame_num: int, total_frames: int) -> Image.Image:
-        """
-        Render a single frame from Lottie animation directly to an in-memory buffer
-        by converting Lottie -> SVG (in a text buffer) -> PNG (in a bytes buffer).
+    @classmethod
+    def _interpolation_search(cls, target_range: tuple, search_space: tuple, evaluator_func) -> tuple[int, int]:
         """
-        try:
-            # Step 1: Use io.StringIO to create a buffer for TEXT data.
-            svg_text_buffer = io.StringIO()
-            export_svg(lottie_animation, svg_text_buffer, frame=frame_num)
-            svg_text = svg_text_buffer.getvalue()
+        Like _binary_search, but picks each next probe by interpolating between the sizes
+        at the ends of the current bracket (regula falsi) instead of taking the midpoint.
+
+        File size grows almost linearly with both frame count and quality, so after probing
+        the two ends this usually lands in the target band within one or two more encodes.
+        If a probe shows the sizes don't grow with the value after all, the rest of the
+        bracket is handed to _binary_search.
 
-            # Step 2: Convert the SVG text (str) into binary data (bytes) using UTF-8 encoding.
-            svg_bytes = svg_text.encode('utf-8')
+        Returns:
+            A tuple of (best_value, best_size). Returns (None, None) if no suitable value is found.
+        """
+        low, high = max(int(search_space[0]), 1), int(search_space[1])
+        if high - low <= _LINEAR_SCAN_MAX_SPAN:
+            return cls._binary_search(target_range, (low, high), evaluator_func)
+
+        # The largest value fitting under the cap is the best one, wherever it lands in the band
+        size_high = evaluator_func(high)
+        if size_high <= target_range[1]:
+            return high, size_high
+        size_low = evaluator_func(low)
+        if size_low > target_range[1]:
+            return None, None
+        if size_low >= target_range[0]:
+            return low, size_low
+
+        # Invariant from here on: size_low is under the band, size_high over it
+        target = (target_range[0] + target_range[1]) / 2
+        crawling, moved_low_before = False, None
+        while high - low > 1:
+            if crawling:
+                # The same end moved twice in a row: interpolation is crawling, bisect once
+                mid = (low + high) // 2
+            else:
+                mid = low + int((high - low) * (target - size_low) / (size_high - size_low))
+            mid = min(max(mid, low + 1), high - 1)
 
-            # Step 3: Convert the in-memory SVG bytes to in-memory PNG bytes.
-            png_buffer = io.BytesIO()
-            cairosvg.svg2png(bytestring=svg_bytes, write_to=png_buffer)
-            png_buffer.seek(0)
+            current_size = evaluator_func(mid)
+            if not size_low <= current_size <= size_high:
+                return cls._binary_search(target_range, (low, high), evaluator_func)
+            if target_range[0] <= current_size <= target_range[1]:
+                return mid, current_size
 
-            # Step 4: Load the PNG from the binary buffer into a PIL Image.
-            img = Image.open(png_buffer).convert('RGBA')
+            moved_low = current_size < target_range[0]
+            if moved_low:
+                low, size_low = mid, current_size
+            else:
+                high, size_high = mid, current_size
+            crawling = not crawling and moved_low == moved_low_before
+            moved_low_before = moved_low
 
-            # Resize if needed
-            if self.width != -1 and self.height != -1:
-                img = img.resize((self.width, self.height), Image.LANCZOS)
-                
-            return img
+        return low, size_low
+    
+    def _render_lottie_frame(self, lottie_animation, frame_num: int, total_frames: int) -> Image.Image:
+        """
+        Render a single frame from Lottie animation directly to pixels in memory
+        by converting Lottie -> SVG (in a bytes buffer) -> cairo surface.
+        """
+        try:
+            # Step 1: Build the frame's SVG. With an output size set, let it stretch to that size
+            # like the resize it replaces, instead of being letterboxed.
+            resize = self.width != -1 and self.height != -1
+            svg_dom = to_svg(lottie_animation, frame_num)
+            if resize:
+                svg_dom.getroot().set('preserveAspectRatio', 'none')
+
+            # Step 2: Write it as compact UTF-8 bytes straight into the buffer left over from the
+            # previous frame (no pretty-printing pass, no str -> bytes copy).
+            svg_buffer = self._svg_buffer
+            svg_buffer.seek(0)
+            svg_buffer.truncate()
+            svg_dom.write(svg_buffer, 'utf-8', True)
+
+            # Step 3: Draw the SVG onto the cairo surface left over from the previous frame (no PNG
+            # encode). cairo rasterizes straight at the output size, so there's nothing to resize.
+            if resize:
+                width, height = self.width, self.height
+            else:
+                width, height = int(lottie_animation.width), int(lottie_animation.height)
+            surface = self._surface
+            if surface is None or (surface.get_width(), surface.get_height()) != (width, height):
+                surface = self._surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+            else:
+                ctx = cairo.Context(surface)
+                ctx.set_operator(cairo.OPERATOR_CLEAR)
+                ctx.paint()
+            _RasterSurface(cairosvg.parser.Tree(bytestring=svg_buffer.getvalue()), surface, width, height)
+            surface.flush()
+
+            # Step 4: Read the surface's premultiplied BGRA pixels into a PIL Image (no PNG decode);
+            # the 'BGRa' decoder unpremultiplies and copies them out before the next frame draws.
+            return Image.frombuffer('RGBA', (width, height), surface.get_data(),
+                                    'raw', 'BGRa', surface.get_stride(), 1)
                 
         except Exception as e:
             # The fallback will catch any errors in this new process
@@ -131,13 +421,83 @@ class TGSToWebPConverter:
 
 
     
+    def _iter_rendered_frames(self, tgs_path: str, lottie_animation, frame_nums: list, total_frames: int):
+        """
+        Render the given original frames and yield them in order as (height, width, 4) RGBA
+        arrays, each as soon as it is ready, so the caller can encode one while the next
+        renders. Frames are spread over all cores of the shared render pool when there are
+        enough of them.
+        """
+        workers = min(os.cpu_count() or 1, len(frame_nums) // _MIN_FRAMES_PER_WORKER)
+        if workers <= 1:
+            yield from self._render_in_background(lottie_animation, frame_nums, total_frames)
+            return
+
+        chunksize = max(1, len(frame_nums) // (4 * workers))
+        pool = _get_render_pool()
+        futures = [pool.submit(_render_frames, tgs_path, (self.width, self.height),
+                               frame_nums[start:start + chunksize], total_frames)
+                   for start in range(0, len(frame_nums), chunksize)]
+        try:
+            for future in futures:
+                yield from future.result()
+        except BrokenProcessPool:
+            _discard_render_pool()
+            raise
+        finally:
+            # Consumer gave up early (encoding failed): don't render what nobody will read
+            for future in futures:
+                future.cancel()
+    
+    def _render_in_background(self, lottie_animation, frame_nums: list, total_frames: int):
+        """
+        Render frames on a helper thread and yield them in order.
+        
+        cairo and libwebp release the GIL while they work, so the next frame is rasterized
+        while the caller encodes this one. At most two frames wait in the queue.
+        """
+        frame_queue = queue.Queue(maxsize=2)
+        stop = threading.Event()
+        done = object()
+        errors = []
+        
+        def put(item):
+            # Give up once the consumer is gone, instead of blocking on a full queue forever
+            while not stop.is_set():
+                try:
+                    frame_queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+        
+        def produce():
+            try:
+                for frame_num in frame_nums:
+                    if stop.is_set():
+                        break
+                    put(np.asarray(self._render_lottie_frame(lottie_animation, frame_num, total_frames)))
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                put(done)
+        
+        thread = threading.Thread(target=produce, daemon=True)
+        thread.start()
+        try:
+            while (frame := frame_queue.get()) is not done:
+                yield frame
+            if errors:
+                raise errors[0]
+        finally:
+            stop.set()
+            thread.join()
+    
     def _create_fallback_frame(self, lottie_animation, frame_num: int, total_frames: int) -> Image.Image:
         """Create a simple fallback frame when Lottie rendering fails."""
-        # Create a simple animated frame with PIL
-        fallback_width = self.width if self.width != -1 else lottie_animation.width
-        fallback_height = self.height if self.height != -1 else lottie_animation.height
-        img = Image.new('RGBA', (fallback_width, fallback_height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
+        # Create a simple animated frame
+        fallback_width = self.width if self.width != -1 else int(lottie_animation.width)
+        fallback_height = self.height if self.height != -1 else int(lottie_animation.height)
+        pixels = np.zeros((fallback_height, fallback_width, 4), dtype=np.uint8)
         
         # Calculate animation progress
         progress = frame_num / max(total_frames - 1, 1)
@@ -147,12 +507,16 @@ class TGSToWebPConverter:
         center_y = int(fallback_height * 0.5)
         radius = int(30 + 20 * abs(0.5 - progress) * 2)
         
-        # Draw a circle
+        # Draw a circle by thresholding the precomputed distances, clipped to the frame
         color = (51, 153, 255, 200)  # Blue with transparency
-        draw.ellipse([center_x - radius, center_y - radius, 
-                     center_x + radius, center_y + radius], fill=color)
+        x0, x1 = max(center_x - radius, 0), min(center_x + radius + 1, fallback_width)
+        y0, y1 = max(center_y - radius, 0), min(center_y + radius + 1, fallback_height)
+        if x0 < x1 and y0 < y1:
+            disk = _FALLBACK_DISK[y0 - center_y + _FALLBACK_MAX_RADIUS:y1 - center_y + _FALLBACK_MAX_RADIUS,
+                                  x0 - center_x + _FALLBACK_MAX_RADIUS:x1 - center_x + _FALLBACK_MAX_RADIUS]
+            pixels[y0:y1, x0:x1][disk <= radius * radius] = color
         
-        return img
+        return Image.fromarray(pixels)
     
 
     
@@ -164,83 +528,109 @@ class TGSToWebPConverter:
         if not os.path.exists(tgs_path):
             raise FileNotFoundError(f"TGS file not found: {tgs_path}")
 
-        # --- Stage 1: Parse and Render ALL Original Frames ---
+        # --- Stage 1: Parse and Render the Original Frames Any Stage Can Use ---
         try:
-            with open(tgs_path, 'rb') as f:
-                lottie_animation = parse_tgs(f)
+            lottie_animation = _load_animation(tgs_path)
         except Exception as e:
             raise ValueError(f"TGS file is invalid or could not be parsed: {e}")
 
         original_total_frames = int(lottie_animation.out_point - lottie_animation.in_point)
         original_fps = lottie_animation.frame_rate
         original_duration = original_total_frames / original_fps
-        
-        print("Pre-rendering all original frames... this might take a moment.")
-        all_frames = [self._render_lottie_frame(lottie_animation, i, original_total_frames) for i in range(original_total_frames)]
-        
-        if not all_frames:
-            raise ValueError("Could not render any frames from the TGS file.")
 
-        # --- Stage 2: The Optimization Gauntlet! ---
         SIZE_CAP_KB = 490 # size cap
         SIZE_TARGET_RANGE = ((SIZE_CAP_KB-100) * 1024, SIZE_CAP_KB * 1024)  # Target [400KB, 500KB]
         MAX_FRAMES_CAP = 30
         FRAME_PIVOT = MAX_FRAMES_CAP // 2
 
-        final_frames = None
+        # Determine initial frame count based on caps
+        initial_frame_count = min(original_total_frames, MAX_FRAMES_CAP)
+
+        # No stage ever uses more than initial_frame_count frames, so only that many evenly
+        # spaced originals are rendered; smaller counts are picked out of this same set.
+        render_indices = [int(i * (original_total_frames - 1) / max(initial_frame_count - 1, 1))
+                          for i in range(initial_frame_count)]
+        all_frames = None
+
+        def render_and_keep():
+            # Packs the frames into one contiguous (frames, height, width, 4) array as they
+            # arrive, for the later stages, while handing each one on to Stage A's encode
+            nonlocal all_frames
+            rendered = self._iter_rendered_frames(tgs_path, lottie_animation, render_indices, original_total_frames)
+            for i, frame in enumerate(rendered):
+                if all_frames is None:
+                    all_frames = np.empty((len(render_indices), *frame.shape), dtype=np.uint8)
+                all_frames[i] = frame
+                yield all_frames[i]
+
+        # --- Stage 2: The Optimization Gauntlet! ---
         final_quality = self.quality # Start with default quality
-        successful_buffer = None
-        # Helper to select a subset of frames evenly
+        winner = None # (frame count, quality) of the probe that gets saved
+        # Helper to select a subset of frames evenly (views into the frame array, not copies)
         def select_frames(source_frames, count):
             if count >= len(source_frames):
                 return source_frames
-            indices = [int(i * (len(source_frames) - 1) / (count - 1)) for i in range(count)]
+            indices = [int(i * (len(source_frames) - 1) / max(count - 1, 1)) for i in range(count)]
             return [source_frames[i] for i in indices]
 
-        # Define evaluators for binary search
-        def eval_frames(num_frames):
-            nonlocal successful_buffer
-            frames_to_test = select_frames(all_frames, num_frames)
-            fps = len(frames_to_test) / original_duration
-            
-            # Create the buffer
-            buffer = self._create_webp_buffer(frames_to_test, final_quality, fps)
-            
-            # IMPORTANT: Store the buffer if it was created
-            if buffer:
-                successful_buffer = buffer
-                return buffer.getbuffer().nbytes
-            return float('inf')
-
-        def eval_quality(quality):
-            nonlocal successful_buffer
-            fps = len(final_frames) / original_duration
-
-            # Create the buffer
-            buffer = self._create_webp_buffer(final_frames, quality, fps)
-            
-            # IMPORTANT: Store the buffer if it was created
-            if buffer:
-                successful_buffer = buffer
-                return buffer.getbuffer().nbytes
-            return float('inf')
-            
-        # Determine initial frame count based on caps
-        initial_frame_count = min(original_total_frames, MAX_FRAMES_CAP)
-        final_frames = select_frames(all_frames, initial_frame_count)
+        # Every (frame count, quality) pair is encoded at most once across all stages, and
+        # the winner's bytes are taken straight from here for the final save
+        probe_cache = {}
+
+        def probe(frame_count, quality):
+            key = (frame_count, quality)
+            if key not in probe_cache:
+                frames_to_test = select_frames(all_frames, frame_count)
+                buffer = self._create_webp_buffer(frames_to_test, quality, len(frames_to_test) / original_duration)
+                probe_cache[key] = (len(buffer), buffer) if buffer else (float('inf'), None)
+            return probe_cache[key][0]
+
+        def modelled_probe(frame_count=None, quality=None):
+            """
+            Evaluator for a stage that varies the one argument left out. Once the stage's size
+            model has two real encodes, candidates it predicts far above the target band return
+            the prediction instead of being encoded. Anything predicted near or under the band
+            is still encoded: the search may pick it, and only real encodes get saved.
+            """
+            vary_frames = frame_count is None
+            model = _SizeModel()
+            # Seed with what earlier stages already encoded along this same line
+            for (f, q), (size, buffer) in probe_cache.items():
+                if buffer and (q == quality if vary_frames else f == frame_count):
+                    model.add(f if vary_frames else q, size)
+
+            def evaluate(value):
+                key = (value, quality) if vary_frames else (frame_count, value)
+                if key not in probe_cache:
+                    predicted = model.predict(value)
+                    if _predicted_too_big(predicted, SIZE_TARGET_RANGE):
+                        return predicted
+                size = probe(*key)
+                if probe_cache[key][1]:
+                    model.add(value, size)
+                return size
+            return evaluate
 
         # --- Run the multi-stage search logic ---
         print(f"Aiming for a file size under {SIZE_CAP_KB}KB.")
 
-        # Stage A: Try with max frames at default quality
-        print(f"[*] Stage A: Testing with {len(final_frames)} frames @ Q={final_quality}...")
-        buffer = self._create_webp_buffer(final_frames, final_quality, len(final_frames) / original_duration)
-        current_size = buffer.getbuffer().nbytes if buffer else float('inf')
+        # Stage A: Try with max frames at default quality. Its frames are encoded while they
+        # are being rendered, instead of after all of them are done.
+        print(f"[*] Stage A: Rendering {initial_frame_count} of {original_total_frames} original frames"
+              f" and testing them @ Q={final_quality}... this might take a moment.")
+        frames = render_and_keep()
+        try:
+            buffer = self._create_webp_buffer(frames, final_quality, initial_frame_count / original_duration)
+        finally:
+            frames.close()  # Stops rendering right away if encoding failed
+        if all_frames is None:
+            raise ValueError("Could not render any frames from the TGS file.")
+        probe_cache[(initial_frame_count, final_quality)] = (len(buffer), buffer)
+        current_size = len(buffer)
 
-        
         if current_size <= SIZE_TARGET_RANGE[1]:
             # It's a success! Hold on to this buffer for the final save.
-            successful_buffer = buffer
+            winner = (initial_frame_count, final_quality)
             print(f"☑️ Success! Size is {current_size / 1024:.1f}KB. No further optimization needed.")
         else:
             print(f"-> Too big ({current_size / 1024:.1f}KB). Starting advanced optimization...")
@@ -261,49 +651,65 @@ class TGSToWebPConverter:
 
             # Stage B: Binary search on frame count [X, Y] @ Q=80
             print(f"[*] Stage B: Searching frame count in [{int(frame_range_1[0])}, {int(frame_range_1[1])}] @ Q=80...")
-            best_f, best_s = self._binary_search(SIZE_TARGET_RANGE, frame_range_1, eval_frames)
+            best_f, best_s = self._interpolation_search(SIZE_TARGET_RANGE, frame_range_1, modelled_probe(quality=final_quality))
 
             if best_f:
+                winner = (best_f, final_quality)
                 print(f"-> ☑️ Found solution in Stage B: {best_f} frames, size {best_s / 1024:.1f}KB.")
             else:
                 # Stage C: Binary search on quality [40, 80] @ Z frames
                 print(f"[*] Stage C: Too big. Fixing at {fallback_frame_count} frames. Searching quality in [{quality_range_1[0]}, {quality_range_1[1]}]...")
-                final_frames = select_frames(all_frames, fallback_frame_count)
-                best_q, best_s = self._binary_search(SIZE_TARGET_RANGE, quality_range_1, eval_quality)
+                best_q, best_s = self._interpolation_search(SIZE_TARGET_RANGE, quality_range_1, modelled_probe(frame_count=fallback_frame_count))
 
                 if best_q:
+                    winner = (fallback_frame_count, best_q)
                     print(f"-> ☑️ Found solution in Stage C: Q={best_q}, size {best_s / 1024:.1f}KB.")
                 else:
                     # Stage D: Binary search on frame count [1, Z] @ Q=40
-                    print(f"[*] Stage D: Still too big. Fixing quality at 40. Searching frames in [{int(frame_range_2[0])}, {int(frame_range_2[1])}]...")
                     final_quality = 40
-                    best_f, best_s = self._binary_search(SIZE_TARGET_RANGE, frame_range_2, eval_frames)
+                    # Real encodes so far bound Stage D's smallest candidate from below: one frame costs
+                    # at least the per-frame average of any encode at Q<=40 (its first frame is the key
+                    # frame, the rest are cheaper deltas)
+                    per_frame_sizes = [size / f for (f, q), (size, buffer) in probe_cache.items()
+                                       if buffer and q <= final_quality]
+                    if per_frame_sizes and min(per_frame_sizes) > _INFEASIBLE_RATIO * SIZE_TARGET_RANGE[1]:
+                        print(f"[*] Stage D: Skipped, even 1 frame @ Q={final_quality} would be over {_INFEASIBLE_RATIO}x the cap.")
+                        best_f = None
+                    else:
+                        print(f"[*] Stage D: Still too big. Fixing quality at 40. Searching frames in [{int(frame_range_2[0])}, {int(frame_range_2[1])}]...")
+                        best_f, best_s = self._interpolation_search(SIZE_TARGET_RANGE, frame_range_2, modelled_probe(quality=final_quality))
                     
                     if best_f:
+                        winner = (best_f, final_quality)
                         print(f"-> ☑️ Found solution in Stage D: {best_f} frames, size {best_s / 1024:.1f}KB.")
                     else:
                         # Stage E: Binary search on quality [1, 40] @ 1 frame
                         print("[*] Stage E: Last resort! Fixing at 1 frame. Searching quality in [1, 40]...")
-                        final_frames = select_frames(all_frames, 1)
                         final_quality = 40 # Start at 40
-                        best_q, best_s = self._binary_search(SIZE_TARGET_RANGE, quality_range_2, eval_quality)
+                        best_q, best_s = self._interpolation_search(SIZE_TARGET_RANGE, quality_range_2, modelled_probe(frame_count=1))
                         
                         if best_q:
                             final_quality = best_q
                         else:
                             # If all else fails, just take the smallest possible quality
                              final_quality = 1
-                        successful_buffer = self._create_webp_buffer(final_frames, final_quality, 1/original_duration)
-                        print(f"->⚠️ Extreme compression: 1 frame, Q={final_quality}, size {current_size / 1024:.1f}KB.")
+                        winner = (1, final_quality)
+                        print(f"->⚠️ Extreme compression: 1 frame, Q={final_quality}, size {probe(*winner) / 1024:.1f}KB.")
 
 
         # --- Stage 3: Final Save ---
         try:
+            successful_buffer = probe_cache[winner][1] if winner else None
+            # Only the winner's bytes are needed from here on; let every other probe go
+            probe_cache.clear()
+            # Nothing is encoded anymore: free the rendered frames (N x H x W x 4 bytes)
+            # instead of holding them through the write
+            all_frames = None
             if successful_buffer:
                 print(f"\nWriting final WebP to '{webp_path}'...")
                 with open(webp_path, 'wb') as f:
                     # Simply write the bytes from the buffer we already created!
-                    f.write(successful_buffer.getvalue())
+                    f.write(successful_buffer)
                 return True
             else:
                  # If the buffer is STILL empty after all stages, the conversion failed.